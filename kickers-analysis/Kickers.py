@@ -6,9 +6,11 @@ def load_and_filter_field_goals(year):
     """
     Load NFL play-by-play data for the specified year and filter for field goal attempts.
     """
-    # Load play-by-play data
-    data = nfl.import_pbp_data([year])
-    field_goals = data[data['play_type'] == 'field_goal']
+    # Load play-by-play data, pulling only the columns the analysis uses
+    # (participation data isn't used, and its merge needs game_id, which is pruned)
+    data = nfl.import_pbp_data([year], columns=['play_id', 'play_type', 'kick_distance', 'field_goal_result'],
+                               include_participation=False)
+    field_goals = data.loc[data['play_type'].eq('field_goal')].copy()
     return field_goals
 
 def analyze_field_goal_distances(field_goals):
@@ -21,9 +23,10 @@ def analyze_field_goal_distances(field_goals):
     field_goals['distance_bucket'] = pd.cut(field_goals['kick_distance'], bins=bins, labels=labels, right=False)
 
     # Calculate attempts and makes
+    field_goals['made'] = (field_goals['field_goal_result'] == 'made').astype('int8')
     fg_summary = field_goals.groupby('distance_bucket').agg(
-        attempts=('play_id', 'count'),
-        makes=('field_goal_result', lambda x: (x == 'made').sum())
+        attempts=('play_id', 'size'),
+        makes=('made', 'sum')
     ).reset_index()
 
     # Calculate success rate
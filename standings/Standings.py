@@ -1,24 +1,49 @@
+import asyncio
+import httpx
 import requests
-import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import orjson
+from collections import defaultdict
 
 # Sleeper API Base URL
 BASE_URL = "https://api.sleeper.app/v1"
 
+# Shared session so every request reuses the same keep-alive connection.
+# Retries back off exponentially, honor Retry-After, and hand back the last
+# response (rather than raising) so callers can still check the status code.
+RETRY = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504],
+              respect_retry_after_header=True, raise_on_status=False)
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=RETRY))
+
 def get_rosters(league_id):
     """
     Fetch rosters for the league.
     """
     url = f"{BASE_URL}/league/{league_id}/rosters"
-    response = requests.get(url)
-    return response.json() if response.status_code == 200 else None
+    response = SESSION.get(url)
+    return orjson.loads(response.content) if response.status_code == 200 else None
 
-def get_matchups(league_id, week):
+async def fetch_matchups_async(league_id, weeks):
     """
-    Fetch matchups for a specific week.
+    Fetch matchups for several weeks at once, multiplexed over one HTTP/2 connection.
+    The transport retries connection errors; 429/5xx responses are retried below.
+    Returns (week, matchups) pairs in week order; matchups is None if the request failed.
     """
-    url = f"{BASE_URL}/league/{league_id}/matchups/{week}"
-    response = requests.get(url)
-    return response.json() if response.status_code == 200 else None
+    transport = httpx.AsyncHTTPTransport(http2=True, retries=3, limits=httpx.Limits(max_connections=20))
+    async with httpx.AsyncClient(transport=transport, timeout=20) as client:
+        async def fetch_week(week):
+            url = f"{BASE_URL}/league/{league_id}/matchups/{week}"
+            # Same policy as the Session's RETRY: back off on 429/5xx, honoring Retry-After
+            for attempt in range(RETRY.total + 1):
+                response = await client.get(url)
+                if response.status_code not in RETRY.status_forcelist or attempt == RETRY.total:
+                    break
+                retry_after = response.headers.get("Retry-After", "")
+                await asyncio.sleep(float(retry_after) if retry_after.isdigit() else RETRY.backoff_factor * 2 ** attempt)
+            return week, (orjson.loads(response.content) if response.status_code == 200 else None)
+        return await asyncio.gather(*(fetch_week(week) for week in weeks))
 
 def process_matchups(league_id, max_week):
     """
@@ -40,28 +65,30 @@ def process_matchups(league_id, max_week):
         "division_ties": 0
     } for roster_id in roster_divisions.keys()}
 
-    for week in range(1, max_week + 1):
-        matchups = get_matchups(league_id, week)
+    # Fetch every week concurrently, then process in week order so results stay deterministic
+    weeks = list(range(1, max_week + 1))
+    weekly = asyncio.run(fetch_matchups_async(league_id, weeks))
+
+    for week, matchups in weekly:
         if not matchups:
             print(f"Failed to fetch matchups for week {week}.")
             continue
 
+        # Group entries by matchup_id so each game is scored exactly once
+        by_match = defaultdict(list)
         for matchup in matchups:
-            roster_id = matchup["roster_id"]
-            points = matchup["points"]
-            opponent_id = matchup.get("matchup_id")
-            opponent_points = None
-
-            # Find opponent's points
-            if opponent_id:
-                opponent_matchup = next((m for m in matchups if m["roster_id"] == opponent_id), None)
-                if opponent_matchup:
-                    opponent_points = opponent_matchup["points"]
-
-            if opponent_points is None:
-                print(f"Could not determine opponent points for roster ID {roster_id} in week {week}.")
+            by_match[matchup.get("matchup_id")].append(matchup)
+
+        for matchup_id, pair in by_match.items():
+            if matchup_id is None or len(pair) != 2:
+                for matchup in pair:
+                    print(f"Could not determine opponent points for roster ID {matchup['roster_id']} in week {week}.")
                 continue
 
+            a, b = pair
+            roster_id, points = a["roster_id"], a["points"]
+            opponent_id, opponent_points = b["roster_id"], b["points"]
+
             # Determine win, loss, or tie
             if points > opponent_points:
                 standings[roster_id]["wins"] += 1
@@ -91,8 +118,9 @@ def save_to_file(data, filename):
     """
     Save data to a JSON file.
     """
-    with open(filename, "w") as f:
-        json.dump(data, f, indent=4)
+    # Roster IDs are ints, so let orjson stringify the keys like json.dump did
+    with open(filename, "wb") as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
 
 def main():
     league_id = "1050127292493721600"
@@ -1,13 +1,32 @@
 
+import os
 import sys
 import time
-import json
+import heapq
+import functools
 from collections import defaultdict
-from typing import Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+import ijson
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 BASE_URL = "https://api.sleeper.app/v1"
 
+# Shared session so every request reuses the same keep-alive connection.
+# Retries back off exponentially, honor Retry-After, and hand back the last
+# response (rather than raising) so callers can still check the status code.
+RETRY = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504],
+              respect_retry_after_header=True, raise_on_status=False)
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=RETRY))
+
+# Local cache for the compact meta derived from the big players payload
+PLAYER_META_CACHE = "player_meta.json"
+CACHE_MAX_AGE_S = 24 * 60 * 60
+
 # Fixed lineup (no FLEX) per user requirements:
 FIXED_REQUIRED = {"QB": 1, "RB": 2, "WR": 3, "TE": 1, "DEF": 1, "K": 1}
 # Normalize possible aliases from Sleeper/player DBs:
@@ -16,33 +35,44 @@ POS_ALIAS = {"DST": "DEF", "D/ST": "DEF", "PK": "K"}
 def normalize_pos(pos: str) -> str:
     return POS_ALIAS.get(pos, pos)
 
-def get_json(url: str, retries: int = 3, sleep_s: float = 0.6):
-    last = None
-    for i in range(retries):
-        try:
-            r = requests.get(url, timeout=20)
-            r.raise_for_status()
-            return r.json()
-        except Exception as e:
-            last = e
-            time.sleep(sleep_s)
-    raise RuntimeError(f"GET failed for {url}: {last}")
+def get_json(url: str):
+    r = SESSION.get(url, timeout=20)
+    r.raise_for_status()
+    return orjson.loads(r.content)
 
+# League metadata, users and rosters don't change within a session, so repeat
+# calls (e.g. looping over weeks) reuse the first response. Treat results as read-only.
+@functools.lru_cache(maxsize=4)
 def get_league(league_id: str) -> dict:
     return get_json(f"{BASE_URL}/league/{league_id}")
 
+@functools.lru_cache(maxsize=4)
 def get_users(league_id: str) -> List[dict]:
     return get_json(f"{BASE_URL}/league/{league_id}/users")
 
+@functools.lru_cache(maxsize=4)
 def get_rosters(league_id: str) -> List[dict]:
     return get_json(f"{BASE_URL}/league/{league_id}/rosters")
 
 def get_matchups(league_id: str, week: int) -> List[dict]:
     return get_json(f"{BASE_URL}/league/{league_id}/matchups/{week}")
 
-def get_players() -> Dict[str, dict]:
-    # Big payload (few MB). Cache if you'd like.
-    return get_json(f"{BASE_URL}/players/nfl")
+def write_json_atomic(path: str, data) -> None:
+    """Write JSON to a temp file and swap it into place so readers never see a partial file."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(orjson.dumps(data))
+    os.replace(tmp, path)
+
+def stream_players():
+    """
+    Yield (player_id, meta) pairs from the big players payload (few MB) as it downloads,
+    so the full dict of every player is never materialized.
+    """
+    with SESSION.get(f"{BASE_URL}/players/nfl", timeout=20, stream=True) as r:
+        r.raise_for_status()
+        r.raw.decode_content = True  # let urllib3 un-gzip before ijson sees the bytes
+        yield from ijson.kvitems(r.raw, "")
 
 def owner_name_lookup(users: List[dict]) -> Dict[str, str]:
     """Map user_id -> best display string (team_name if present, else display_name/username)."""
@@ -86,18 +116,30 @@ def compute_required_from_league(league: dict) -> Dict[str, int]:
             counts[k] = v
     return dict(counts)
 
-def build_player_meta_by_id(players_all: dict) -> Dict[str, dict]:
+def build_player_meta_by_id(players_items: Iterable[Tuple[str, dict]]) -> Dict[str, dict]:
     """
-    Extract id -> {'full_name':..., 'position':...}
+    Extract id -> {'full_name':..., 'position':...} from (player_id, meta) pairs.
     Sleeper keys are strings (player_id). Position is like 'QB','RB','WR','TE','DEF','K'.
     """
     out = {}
-    for pid, meta in players_all.items():
+    for pid, meta in players_items:
         full = meta.get("full_name") or " ".join([meta.get("first_name",""), meta.get("last_name","")]).strip() or pid
-        pos = normalize_pos(meta.get("position") or "")
-        out[pid] = {"full_name": full, "position": pos}
+        pos = meta.get("position") or ""
+        out[pid] = {"full_name": full, "position": POS_ALIAS.get(pos, pos)}
     return out
 
+def load_player_meta() -> Dict[str, dict]:
+    """
+    Return id -> meta from PLAYER_META_CACHE if it is younger than CACHE_MAX_AGE_S,
+    otherwise stream-parse the players payload and persist only the compact meta.
+    """
+    if os.path.exists(PLAYER_META_CACHE) and time.time() - os.path.getmtime(PLAYER_META_CACHE) < CACHE_MAX_AGE_S:
+        with open(PLAYER_META_CACHE, "rb") as f:
+            return orjson.loads(f.read())
+    meta_by_id = build_player_meta_by_id(stream_players())
+    write_json_atomic(PLAYER_META_CACHE, meta_by_id)
+    return meta_by_id
+
 def build_roster_pool(matchup_entry: dict, player_meta_by_id: Dict[str,dict]) -> List[dict]:
     """
     From the matchup entry for THIS roster, build a pool of all rostered players and their week points.
@@ -108,7 +150,7 @@ def build_roster_pool(matchup_entry: dict, player_meta_by_id: Dict[str,dict]) ->
     out = []
     for pid in pids:
         meta = player_meta_by_id.get(pid, {})
-        pos = normalize_pos(meta.get("position") or "")
+        pos = meta.get("position") or ""  # already normalized by build_player_meta_by_id
         score = float(points_map.get(pid, 0.0) or 0.0)
         out.append({
             "player_id": pid,
@@ -127,22 +169,80 @@ def select_fixed_best(players: List[dict], required: Dict[str,int]) -> Tuple[Lis
     for p in players:
         if p["position"] in required:
             by_pos[p["position"]].append(p)
-    for pos in by_pos:
-        by_pos[pos].sort(key=lambda x: x["score"], reverse=True)
 
     chosen = []
     for pos, need in required.items():
-        chosen += [{**p, "slot": pos} for p in by_pos.get(pos, [])[:need]]
+        top = heapq.nlargest(need, by_pos.get(pos, []), key=lambda x: x["score"])
+        chosen += [{**p, "slot": pos} for p in top]
     total = sum(p["score"] for p in chosen)
     return chosen, total
 
-def find_top_roster_for_week(league_id: str, week: int):
-    league = get_league(league_id)
+def fixed_best_total(players: List[dict], required: Dict[str,int]) -> float:
+    """
+    Total of select_fixed_best without building the lineup: one pass over the pool,
+    keeping a min-heap of size `need` per position.
+    """
+    heaps = defaultdict(list)
+    for p in players:
+        need = required.get(p["position"], 0)
+        if not need:
+            continue
+        h = heaps[p["position"]]
+        if len(h) < need:
+            heapq.heappush(h, p["score"])
+        elif p["score"] > h[0]:
+            heapq.heapreplace(h, p["score"])
+    return sum(sum(h) for h in heaps.values())
+
+def select_best_roster_bounded(matchup_by_rid: Dict[int,dict], player_meta_by_id: Dict[str,dict],
+                               required: Dict[str,int]) -> Tuple[Optional[int], List[dict], float]:
+    """
+    Find only the top roster (branch-and-bound). Rosters are visited by an upper bound
+    (sum of their best sum(required) eligible scores clamped at zero, ignoring positions) and we stop once
+    no remaining bound can beat the current best. Ties go to the earlier roster, as in the full path.
+    Returns (roster_id, lineup, total); roster_id is None when there are no rosters.
+    """
+    slots = sum(required.values())
+    candidates = []
+    for idx, (rid, m) in enumerate(matchup_by_rid.items()):
+        pool = build_roster_pool(m, player_meta_by_id)
+        # clamp at zero: an empty slot contributes nothing, so a negative score must not lower the bound
+        bound = sum(heapq.nlargest(slots, (max(p["score"], 0.0) for p in pool if p["position"] in required)))
+        candidates.append((bound, idx, rid, pool))
+    candidates.sort(key=lambda c: (-c[0], c[1]))
+
+    best_idx, best_rid, best_pool, best_total = None, None, None, -1.0
+    for bound, idx, rid, pool in candidates:
+        if bound < best_total:
+            break
+        total = fixed_best_total(pool, required)
+        if best_idx is None or total > best_total or (total == best_total and idx < best_idx):
+            best_idx, best_rid, best_pool, best_total = idx, rid, pool, total
+
+    if best_rid is None:
+        return None, [], best_total
+    # only the winner's lineup is materialized
+    lineup, total = select_fixed_best(best_pool, required)
+    return best_rid, lineup, total
+
+def find_top_roster_for_week(league_id: str, week: int, want_all: bool = True):
+    """
+    Returns (best, results, required). With want_all=False only `best` is computed via the
+    branch-and-bound fast path and `results` is empty.
+    """
+    # the fetches are independent, so overlap them instead of paying each round trip in turn
+    with ThreadPoolExecutor(max_workers=5) as ex:
+        fut_league = ex.submit(get_league, league_id)
+        fut_users = ex.submit(get_users, league_id)
+        fut_rosters = ex.submit(get_rosters, league_id)
+        fut_matchups = ex.submit(get_matchups, league_id, week)
+        fut_meta = ex.submit(load_player_meta)
+        league = fut_league.result()
+        users = fut_users.result()
+        rosters = fut_rosters.result()
+        matchups = fut_matchups.result()
+        meta_by_id = fut_meta.result()
     required = compute_required_from_league(league)
-    users = get_users(league_id)
-    rosters = get_rosters(league_id)
-    matchups = get_matchups(league_id, week)
-    players_all = get_players()
 
     name_by_user = owner_name_lookup(users)
     owner_by_roster = roster_owner_lookup(rosters)
@@ -154,8 +254,6 @@ def find_top_roster_for_week(league_id: str, week: int):
         if rid is not None:
             matchup_by_rid[rid] = m
 
-    meta_by_id = build_player_meta_by_id(players_all)
-
     best = {
         "roster_id": None,
         "owner_name": "",
@@ -165,10 +263,19 @@ def find_top_roster_for_week(league_id: str, week: int):
 
     results = []  # keep all for optional inspection
 
+    # no matchup entry (bye or league oddity) — skip
+    scored = {rid: matchup_by_rid[rid] for rid in owner_by_roster if matchup_by_rid.get(rid)}
+
+    if not want_all:
+        rid, lineup, total = select_best_roster_bounded(scored, meta_by_id, required)
+        if rid is not None:
+            owner_name = name_by_user.get(owner_by_roster[rid], f"Roster {rid}")
+            best.update({"roster_id": rid, "owner_name": owner_name, "total": total, "lineup": lineup})
+        return best, results, required
+
     for rid, owner_id in owner_by_roster.items():
-        m = matchup_by_rid.get(rid)
+        m = scored.get(rid)
         if not m:
-            # no matchup entry (bye or league oddity) — skip
             continue
         pool = build_roster_pool(m, meta_by_id)
         lineup, total = select_fixed_best(pool, required)
@@ -185,8 +292,8 @@ def print_winner(best: dict, required: Dict[str,int], league_id: str, week: int)
     print(f"\nTop roster: {best['owner_name']} (roster_id={best['roster_id']})")
     print(f"Max possible points: {best['total']:.2f}\n")
     # sort by slot order for stable print
-    slot_order = list(required.keys())
-    lineup_sorted = sorted(best["lineup"], key=lambda p: slot_order.index(p["slot"]) if p["slot"] in slot_order else 999)
+    slot_rank = {s: i for i, s in enumerate(required)}
+    lineup_sorted = sorted(best["lineup"], key=lambda p: slot_rank.get(p["slot"], 999))
     for p in lineup_sorted:
         print(f"  {p['slot']:>3}  {p['player_name']:<28} {p['score']:.2f}")
 
@@ -196,12 +303,12 @@ def print_all(results: list, required: Dict[str,int], league_id: str, week: int)
     print("Fixed-slot requirements (no FLEX): " + ", ".join(f"{k}={v}" for k,v in required.items()))
     print("\n=== All Teams (sorted by max possible points) ===")
     # stable slot ordering
-    slot_order = list(required.keys())
+    slot_rank = {s: i for i, s in enumerate(required)}
     # sort teams by total desc, then by name
     results_sorted = sorted(results, key=lambda r: (-r["total"], r["owner_name"]))
     for rank, r in enumerate(results_sorted, 1):
         print(f"\n[{rank}] {r['owner_name']} (roster_id={r['roster_id']}) — {r['total']:.2f}")
-        lineup_sorted = sorted(r["lineup"], key=lambda p: slot_order.index(p["slot"]) if p["slot"] in slot_order else 999)
+        lineup_sorted = sorted(r["lineup"], key=lambda p: slot_rank.get(p["slot"], 999))
         for p in lineup_sorted:
             print(f"  {p['slot']:>3}  {p['player_name']:<28} {p['score']:.2f}")
 
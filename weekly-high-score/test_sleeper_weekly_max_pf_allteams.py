@@ -0,0 +1,54 @@
+"""
+Checks that the branch-and-bound fast path picks the same top roster as the full per-roster path.
+Run with `python test_sleeper_weekly_max_pf_allteams.py` or pytest.
+"""
+import random
+
+from sleeper_weekly_max_pf_allteams import (
+    FIXED_REQUIRED,
+    build_roster_pool,
+    select_best_roster_bounded,
+    select_fixed_best,
+)
+
+def full_path_best(matchup_by_rid, meta_by_id, required):
+    # same rule as find_top_roster_for_week: first roster with a strictly greater total wins
+    best_rid, best_total = None, -1.0
+    for rid, m in matchup_by_rid.items():
+        _, total = select_fixed_best(build_roster_pool(m, meta_by_id), required)
+        if best_rid is None or total > best_total:
+            best_rid, best_total = rid, total
+    return best_rid, best_total
+
+def test_negative_scores_with_missing_slot():
+    meta = {"q1": {"full_name": "QB One", "position": "QB"},
+            "q2": {"full_name": "QB Two", "position": "QB"},
+            "q3": {"full_name": "QB Three", "position": "QB"},
+            "k1": {"full_name": "K One", "position": "K"}}
+    matchups = {1: {"players": ["q1", "q2"], "players_points": {"q1": 10.0, "q2": -5.0}},
+                2: {"players": ["q3", "k1"], "players_points": {"q3": 4.0, "k1": 4.0}}}
+    rid, lineup, total = select_best_roster_bounded(matchups, meta, {"QB": 1, "K": 1})
+    assert (rid, total) == (1, 10.0)
+    assert [p["player_id"] for p in lineup] == ["q1"]
+
+def test_matches_full_path_on_random_leagues():
+    rng = random.Random(7)
+    positions = ["QB", "RB", "WR", "TE", "DEF", "K", "LB"]
+    for _ in range(500):
+        meta = {str(i): {"full_name": f"P{i}", "position": rng.choice(positions)} for i in range(150)}
+        # sometimes drop a position from the whole pool so slots go unfilled
+        missing = rng.choice(positions + [None, None])
+        matchups = {}
+        for rid in range(1, 13):
+            pids = [p for p in rng.sample(list(meta), rng.randint(3, 18)) if meta[p]["position"] != missing]
+            points = {p: rng.choice([0.0, -2.0, -6.5, round(rng.uniform(-8, 35), 2)]) for p in pids}
+            matchups[rid] = {"players": pids, "players_points": points}
+        rid, lineup, total = select_best_roster_bounded(matchups, meta, FIXED_REQUIRED)
+        exp_rid, exp_total = full_path_best(matchups, meta, FIXED_REQUIRED)
+        assert (rid, total) == (exp_rid, exp_total)
+        assert lineup == select_fixed_best(build_roster_pool(matchups[exp_rid], meta), FIXED_REQUIRED)[0]
+
+if __name__ == "__main__":
+    test_negative_scores_with_missing_slot()
+    test_matches_full_path_on_random_leagues()
+    print("ok")
@@ -1,80 +1,132 @@
+import asyncio
+import itertools
+import httpx
 import requests
-import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import orjson
 import matplotlib.pyplot as plt
 import os
+import time
 import numpy as np
+import pandas as pd
 
 # Sleeper API Base URL
 BASE_URL = "https://api.sleeper.app/v1"
 
-def get_matchups(league_id, week):
+# Shared session so every request reuses the same keep-alive connection.
+# Retries back off exponentially, honor Retry-After, and hand back the last
+# response (rather than raising) so callers can still check the status code.
+RETRY = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504],
+              respect_retry_after_header=True, raise_on_status=False)
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=RETRY))
+
+async def fetch_matchups_async(league_id, weeks):
+    """
+    Fetch matchups for several weeks at once, multiplexed over one HTTP/2 connection.
+    The transport retries connection errors; 429/5xx responses are retried below.
+    Returns (week, matchups) pairs in week order; matchups is None if the request failed.
     """
-    Fetch matchups for a specific week.
+    transport = httpx.AsyncHTTPTransport(http2=True, retries=3, limits=httpx.Limits(max_connections=20))
+    async with httpx.AsyncClient(transport=transport, timeout=20) as client:
+        async def fetch_week(week):
+            url = f"{BASE_URL}/league/{league_id}/matchups/{week}"
+            # Same policy as the Session's RETRY: back off on 429/5xx, honoring Retry-After
+            for attempt in range(RETRY.total + 1):
+                response = await client.get(url)
+                if response.status_code not in RETRY.status_forcelist or attempt == RETRY.total:
+                    break
+                retry_after = response.headers.get("Retry-After", "")
+                await asyncio.sleep(float(retry_after) if retry_after.isdigit() else RETRY.backoff_factor * 2 ** attempt)
+            return week, (orjson.loads(response.content) if response.status_code == 200 else None)
+        return await asyncio.gather(*(fetch_week(week) for week in weeks))
+
+def build_positions_frame(players):
     """
-    url = f"{BASE_URL}/league/{league_id}/matchups/{week}"
-    response = requests.get(url)
-    return response.json() if response.status_code == 200 else None
+    Build a player_id -> position lookup table once so weekly scores can be joined against it.
+    """
+    return pd.DataFrame(
+        [(player_id, info.get("position")) for player_id, info in players.items()],
+        columns=["pid", "pos"],
+    ).set_index("pid")
 
-def get_players():
+def get_player_positions():
     """
-    Load player data from a local file if it exists; otherwise, fetch it from the Sleeper API and save it to a file.
+    Load the player_id -> position table from a local pickle file if it is less than a day old;
+    otherwise, fetch player data from the Sleeper API and save only the derived table.
     """
-    file_name = "player_database.json"
-    if os.path.exists(file_name):
+    file_name = "player_meta.pkl"
+    if os.path.exists(file_name) and time.time() - os.path.getmtime(file_name) < 24 * 60 * 60:
         print(f"Loading player data from {file_name}...")
-        with open(file_name, "r") as f:
-            return json.load(f)
+        return pd.read_pickle(file_name)
     else:
-        print(f"{file_name} not found. Fetching data from Sleeper API...")
+        print(f"{file_name} missing or stale. Fetching data from Sleeper API...")
         url = f"{BASE_URL}/players/nfl"
-        response = requests.get(url)
+        response = SESSION.get(url)
         if response.status_code == 200:
-            player_data = response.json()
-            with open(file_name, "w") as f:
-                json.dump(player_data, f, indent=4)
+            positions_df = build_positions_frame(orjson.loads(response.content))
+            positions_df.to_pickle(file_name)
             print(f"Player data saved to {file_name}.")
-            return player_data
+            return positions_df
         else:
             print("Failed to fetch player data from Sleeper API.")
             return None
 
-def find_scores_by_position(league_id, players, start_week, end_week, position):
+def find_scores_by_positions(league_id, positions_df, start_week, end_week, positions=("K", "TE")):
     """
-    Retrieve highest and 12th-highest scores by position for each week.
+    Retrieve highest and 12th-highest scores for each position for each week.
+    Every week is fetched once and scored for all positions in the same pass.
     """
-    weekly_scores = []
+    weekly_scores = {position: [] for position in positions}
+
+    # Encode each wanted position as a small int once (index into `positions`); everyone else is -1
+    pos_code = positions_df["pos"].map({position: i for i, position in enumerate(positions)})
+    code_by_pid = pos_code.dropna().astype("int8").to_dict()
 
-    for week in range(start_week, end_week + 1):
-        matchups = get_matchups(league_id, week)
+    # Fetch every week concurrently, then process in week order
+    weeks = list(range(start_week, end_week + 1))
+    weekly = asyncio.run(fetch_matchups_async(league_id, weeks))
+
+    for week, matchups in weekly:
         if not matchups:
             print(f"Failed to fetch matchups for week {week}.")
             continue
 
-        position_scores = []
-
-        for matchup in matchups:
-            players_points = matchup.get("players_points", {})
-            for player_id, score in players_points.items():
-                player_info = players.get(player_id, {})
-                if player_info.get("position") == position:  # Check if the player matches the position
-                    position_scores.append(score)
-
-        if position_scores:
-            position_scores.sort(reverse=True)  # Sort scores in descending order
-            highest_score = position_scores[0]
-            twelfth_highest_score = position_scores[11] if len(position_scores) >= 12 else None
-            weekly_scores.append({
-                "week": week,
-                "highest_score": highest_score,
-                "12th_highest_score": twelfth_highest_score
-            })
-        else:
-            print(f"No {position} scores found for week {week}.")
-            weekly_scores.append({
-                "week": week,
-                "highest_score": None,
-                "12th_highest_score": None
-            })
+        # Parallel arrays of every scored player this week and their position code
+        points = [matchup.get("players_points") or {} for matchup in matchups]
+        n = sum(len(p) for p in points)
+        scores = np.fromiter(itertools.chain.from_iterable(p.values() for p in points), dtype=float, count=n)
+        codes = np.fromiter(
+            (code_by_pid.get(player_id, -1) for player_id in itertools.chain.from_iterable(points)),
+            dtype=np.int8, count=n,
+        )
+
+        top_by_position = {}
+        for i, position in enumerate(positions):
+            position_scores = scores[codes == i]
+            # Top 12 without a full sort, then order just those
+            if len(position_scores) > 12:
+                position_scores = np.partition(position_scores, len(position_scores) - 12)[-12:]
+            top_by_position[position] = np.sort(position_scores)[::-1].tolist()
+
+        for position in positions:
+            top_scores = top_by_position.get(position, [])
+            if top_scores:
+                highest_score = top_scores[0]
+                twelfth_highest_score = top_scores[11] if len(top_scores) >= 12 else None
+                weekly_scores[position].append({
+                    "week": week,
+                    "highest_score": highest_score,
+                    "12th_highest_score": twelfth_highest_score
+                })
+            else:
+                print(f"No {position} scores found for week {week}.")
+                weekly_scores[position].append({
+                    "week": week,
+                    "highest_score": None,
+                    "12th_highest_score": None
+                })
 
     return weekly_scores
 
@@ -82,51 +134,43 @@ def plot_scores(weekly_kicker_scores, weekly_te_scores):
     """
     Plot highest and 12th-highest kicker and TE scores by week, with average lines.
     """
-    weeks = [entry["week"] for entry in weekly_kicker_scores]
-    kicker_highest = [entry["highest_score"] for entry in weekly_kicker_scores]
-    kicker_12th = [entry["12th_highest_score"] for entry in weekly_kicker_scores]
+    # None (no scores that week) becomes NaN so numpy can skip it
+    weeks = np.asarray([entry["week"] for entry in weekly_kicker_scores])
+    kicker_highest = np.array([entry["highest_score"] for entry in weekly_kicker_scores], dtype=float)
+    kicker_12th = np.array([entry["12th_highest_score"] for entry in weekly_kicker_scores], dtype=float)
 
-    te_highest = [entry["highest_score"] for entry in weekly_te_scores]
-    te_12th = [entry["12th_highest_score"] for entry in weekly_te_scores]
+    te_highest = np.array([entry["highest_score"] for entry in weekly_te_scores], dtype=float)
+    te_12th = np.array([entry["12th_highest_score"] for entry in weekly_te_scores], dtype=float)
 
     bar_width = 0.2  # Width of each bar
     group_spacing = 0.5  # Space between kicker and TE groups
 
-    # Calculate averages (ignore None values)
-    avg_kicker_highest = np.mean([score for score in kicker_highest if score is not None])
-    avg_kicker_12th = np.mean([score for score in kicker_12th if score is not None])
-    avg_te_highest = np.mean([score for score in te_highest if score is not None])
-    avg_te_12th = np.mean([score for score in te_12th if score is not None])
+    # Calculate averages (ignore missing weeks)
+    avg_kicker_highest = np.nanmean(kicker_highest)
+    avg_kicker_12th = np.nanmean(kicker_12th)
+    avg_te_highest = np.nanmean(te_highest)
+    avg_te_12th = np.nanmean(te_12th)
 
     # Calculate positions
-    kicker_positions = [x for x in weeks]
-    kicker_highest_pos = [x - bar_width / 2 for x in kicker_positions]
-    kicker_12th_pos = [x + bar_width / 2 for x in kicker_positions]
+    kicker_highest_pos = weeks - bar_width / 2
+    kicker_12th_pos = weeks + bar_width / 2
 
-    te_positions = [x + group_spacing for x in weeks]
-    te_highest_pos = [x - bar_width / 2 for x in te_positions]
-    te_12th_pos = [x + bar_width / 2 for x in te_positions]
+    te_positions = weeks + group_spacing
+    te_highest_pos = te_positions - bar_width / 2
+    te_12th_pos = te_positions + bar_width / 2
 
     # Plot bars
-    plt.figure(figsize=(14, 8))
-    plt.bar(kicker_highest_pos, kicker_highest, width=bar_width, label="K Highest Scorer", color="blue")
-    plt.bar(kicker_12th_pos, kicker_12th, width=bar_width, label="K 12th Highest Scorer", color="cyan")
-    plt.bar(te_highest_pos, te_highest, width=bar_width, label="TE Highest Scorer", color="orange")
-    plt.bar(te_12th_pos, te_12th, width=bar_width, label="TE 12th Highest Scorer", color="red")
-
-    # Add labels for the data points
-    for x, y in zip(kicker_highest_pos, kicker_highest):
-        if y is not None:
-            plt.text(x, y, f"{y:.1f}", ha="center", va="bottom", fontsize=8)
-    for x, y in zip(kicker_12th_pos, kicker_12th):
-        if y is not None:
-            plt.text(x, y, f"{y:.1f}", ha="center", va="bottom", fontsize=8)
-    for x, y in zip(te_highest_pos, te_highest):
-        if y is not None:
-            plt.text(x, y, f"{y:.1f}", ha="center", va="bottom", fontsize=8)
-    for x, y in zip(te_12th_pos, te_12th):
-        if y is not None:
-            plt.text(x, y, f"{y:.1f}", ha="center", va="bottom", fontsize=8)
+    fig, ax = plt.subplots(figsize=(14, 8))
+    bars = [
+        ax.bar(kicker_highest_pos, kicker_highest, width=bar_width, label="K Highest Scorer", color="blue"),
+        ax.bar(kicker_12th_pos, kicker_12th, width=bar_width, label="K 12th Highest Scorer", color="cyan"),
+        ax.bar(te_highest_pos, te_highest, width=bar_width, label="TE Highest Scorer", color="orange"),
+        ax.bar(te_12th_pos, te_12th, width=bar_width, label="TE 12th Highest Scorer", color="red"),
+    ]
+
+    # Add labels for the data points (NaN bars get no label)
+    for container in bars:
+        ax.bar_label(container, fmt="%.1f", fontsize=8)
 
     # Add average lines
     plt.axhline(avg_kicker_highest, color="blue", linestyle="--", linewidth=1.5, label=f"Avg K Highest: {avg_kicker_highest:.1f}")
@@ -155,20 +199,17 @@ def main():
 
     # Fetch player data
     print("Fetching player data...")
-    players = get_players()
-    if not players:
+    positions_df = get_player_positions()
+    if positions_df is None:
         print("Failed to fetch player data.")
         return
 
     # Find kicker and TE scores for each week
-    print("Processing kicker scores...")
-    weekly_kicker_scores = find_scores_by_position(league_id, players, start_week, end_week, "K")
-
-    print("Processing TE scores...")
-    weekly_te_scores = find_scores_by_position(league_id, players, start_week, end_week, "TE")
+    print("Processing kicker and TE scores...")
+    weekly_scores = find_scores_by_positions(league_id, positions_df, start_week, end_week, ("K", "TE"))
 
     # Plot results
-    plot_scores(weekly_kicker_scores, weekly_te_scores)
+    plot_scores(weekly_scores["K"], weekly_scores["TE"])
 
 if __name__ == "__main__":
     main()